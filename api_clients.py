@@ -4,509 +4,776 @@ Handles API calls to OpenAI, Anthropic, Google, xAI, DeepSeek, and Groq.
 """
 
 import os
+import atexit
+import re
+import json
+import queue
+import gzip
+import hashlib
+import random
+import functools
+import threading
 import asyncio
 import aiohttp
 import logging
-from typing import Dict, List, Any, Optional, AsyncGenerator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Dict, List, Any, Optional, Tuple, TypeVar, Iterator, AsyncGenerator, AsyncIterator, Coroutine
 
-from config import calculate_cost, get_model_max_tokens
+from aiolimiter import AsyncLimiter
+
+try:
+    import uvloop
+except ImportError:
+    # uvloop isn't available on Windows; fall back to the default loop
+    uvloop = None
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+    _json_dumps = orjson.dumps
+except ImportError:
+    _json_loads = json.loads
+
+    def _json_dumps(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+from config import PROVIDER_RATE_LIMITS, calculate_cost, get_model_max_tokens
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar('T')
+
+# Event loop (run in a daemon thread), HTTP session and client shared by sync callers
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+_session: Optional[aiohttp.ClientSession] = None
+_client: Optional['APIClient'] = None
+
+# Concurrent in-flight requests allowed per provider host
+DEFAULT_HOST_CONCURRENCY = 32
+
+# Number of per-key rate limiters kept per client
+KEY_LIMITER_CACHE_SIZE = 1024
+
+# Compression level for request bodies over compress_threshold
+GZIP_LEVEL = 6
+
+# Worker threads for the shared loop's default executor. Nothing here
+# submits work to it directly; on the plain asyncio fallback (no uvloop)
+# DNS lookups run in it, and those are cached by the connector.
+LOOP_EXECUTOR_WORKERS = 2
+
+# Retry policy for rate-limited / overloaded responses
+RETRY_STATUSES = (429, 503)
+MAX_RETRIES = 3
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 30.0
+
+# OpenAI reasoning model families (no temperature parameter), optionally
+# behind a "vendor/" prefix
+REASONING_MODEL_RE = re.compile(r'(?:^|/)(?:o1|o3)', re.IGNORECASE)
+
+# Gemini names the assistant role "model"; system messages are sent separately
+GOOGLE_ROLES = {'user': 'user', 'assistant': 'model'}
+
+# Server-sent event framing
+SSE_READ_SIZE = 65536
+SSE_LINE_END = b'\n'
+SSE_EVENT_END = b'\n\n'
+SSE_DATA_PREFIX = b'data: '
+SSE_DATA_OFFSET = len(SSE_DATA_PREFIX)
+SSE_EVENT_PREFIX = b'event: '
+SSE_DONE = b'[DONE]'
+
+# Matches rate limit reset durations such as "1s", "6m0s" or "20ms"
+_DURATION_RE = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+_DURATION_UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+
+
+def _parse_duration(value: str) -> Optional[float]:
+    """Parse a rate limit reset duration header into seconds."""
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def create_session(pool_per_host: int = 32, keepalive_timeout: float = 75) -> aiohttp.ClientSession:
+    """Create an HTTP session with a connection pool tuned for provider APIs."""
+    # Each provider is a separate host, so cap connections per host
+    # rather than in total and keep idle connections warm.
+    connector = aiohttp.TCPConnector(
+        limit=0,
+        limit_per_host=pool_per_host,
+        ttl_dns_cache=300,
+        keepalive_timeout=keepalive_timeout,
+        force_close=False,
+        enable_cleanup_closed=True,
+        happy_eyeballs_delay=0.25,
+    )
+    # Responses are decompressed transparently; aiohttp advertises the
+    # encodings it can decode in Accept-Encoding.
+    return aiohttp.ClientSession(connector=connector, auto_decompress=True)
+
+
+def _build_headers(provider: str, api_key: str) -> Dict[str, str]:
+    """Build the authenticated request headers for a provider."""
+    if provider == 'anthropic':
+        return {
+            "x-api-key": api_key,
+            "Content-Type": "application/json",
+            "anthropic-version": "2023-06-01"
+        }
+    if provider == 'google':
+        return {
+            "x-goog-api-key": api_key,
+            "Content-Type": "application/json"
+        }
+    return {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    }
+
+
+def _system_prompt(messages: List[Dict]) -> str:
+    """Return the content of the last system message, if any."""
+    return next((m['content'] for m in reversed(messages) if m['role'] == 'system'), '')
+
+
+def _to_anthropic(messages: List[Dict]) -> Tuple[str, List[Dict]]:
+    """Split messages into an Anthropic system prompt and chat turns."""
+    return _system_prompt(messages), [m for m in messages if m['role'] != 'system']
+
+
+def _to_google(messages: List[Dict]) -> Tuple[str, List[Dict]]:
+    """Split messages into a Gemini system instruction and contents."""
+    contents = [
+        {'role': GOOGLE_ROLES[m['role']], 'parts': [{'text': m['content']}]}
+        for m in messages if m['role'] in GOOGLE_ROLES
+    ]
+    return _system_prompt(messages), contents
+
+
+def _anthropic_members(messages: List[Dict]) -> Dict[str, Any]:
+    """Build the message fields of an Anthropic request body."""
+    system_content, chat_messages = _to_anthropic(messages)
+    members: Dict[str, Any] = {"messages": chat_messages}
+    if system_content:
+        members["system"] = system_content
+    return members
+
+
+def _google_members(messages: List[Dict]) -> Dict[str, Any]:
+    """Build the message fields of a Gemini request body."""
+    system_instruction, contents = _to_google(messages)
+    members: Dict[str, Any] = {'contents': contents}
+    if system_instruction:
+        members['systemInstruction'] = {'parts': [{'text': system_instruction}]}
+    return members
+
+
+@functools.lru_cache(maxsize=128)
+def _is_reasoning_model(model: str) -> bool:
+    """Check if model is an OpenAI reasoning model that doesn't support temperature."""
+    return REASONING_MODEL_RE.search(model) is not None
+
+
+def _sse_payloads(block: bytes, event_line: Optional[bytes]) -> List[bytes]:
+    """Get the data payloads of one event, or none if its name doesn't match."""
+    lines = block.split(SSE_LINE_END)
+    if event_line is not None and event_line not in lines:
+        return []
+    return [line[SSE_DATA_OFFSET:] for line in lines if line.startswith(SSE_DATA_PREFIX)]
+
+
+async def _iter_sse_data(response: aiohttp.ClientResponse,
+                         event: Optional[bytes] = None) -> AsyncGenerator[bytes, None]:
+    """
+    Yield the raw data payload of each server-sent event in a response.
+
+    If event is given, only events with that event name are yielded, so
+    other events are skipped without being parsed.
+    """
+    event_line = SSE_EVENT_PREFIX + event if event is not None else None
+    buf = bytearray()
+    async for chunk in response.content.iter_chunked(SSE_READ_SIZE):
+        buf += chunk
+        if b'\r' in buf:
+            # Normalise CRLF line endings (Gemini) so events split on LF only
+            buf = buf.replace(b'\r\n', SSE_LINE_END)
+        start = 0
+        while True:
+            end = buf.find(SSE_EVENT_END, start)
+            if end < 0:
+                break
+            for payload in _sse_payloads(bytes(buf[start:end]), event_line):
+                yield payload
+            start = end + len(SSE_EVENT_END)
+        if start:
+            del buf[:start]
+
+    # Flush a trailing event that wasn't terminated by a blank line
+    for payload in _sse_payloads(bytes(buf), event_line):
+        yield payload
+
+
+def _retry_delay(headers, attempt: int) -> float:
+    """Seconds to wait before retrying, honouring Retry-After if present."""
+    retry_after = headers.get('retry-after')
+    if retry_after:
+        try:
+            return min(float(retry_after), RETRY_MAX_DELAY)
+        except ValueError:
+            pass
+    delay = RETRY_BASE_DELAY * (2 ** attempt)
+    return min(delay + random.uniform(0, RETRY_BASE_DELAY), RETRY_MAX_DELAY)
+
 
 class APIClient:
     """Unified API client for all providers."""
 
-    def __init__(self, api_keys: Dict[str, str] = None):
+    OPENAI_URL = "https://api.openai.com/v1/chat/completions"
+    ANTHROPIC_URL = "https://api.anthropic.com/v1/messages"
+    GOOGLE_URL = "https://generativelanguage.googleapis.com/v1beta/models"
+    XAI_URL = "https://api.x.ai/v1/chat/completions"
+    DEEPSEEK_URL = "https://api.deepseek.com/v1/chat/completions"
+    GROQ_URL = "https://api.groq.com/openai/v1/chat/completions"
+
+    def __init__(self, api_keys: Dict[str, str] = None, pool_per_host: int = 32,
+                 keepalive_timeout: float = 75,
+                 rate_limits: Dict[str, Tuple[float, float]] = None,
+                 session: Optional[aiohttp.ClientSession] = None,
+                 per_host_concurrency: Dict[str, int] = None,
+                 require_keys: Optional[List[str]] = None,
+                 compress_threshold: Optional[int] = None):
         """
         Initialize with API keys.
 
         Args:
             api_keys: Dict mapping provider names to API keys
+            pool_per_host: Maximum open connections to each provider host
+            keepalive_timeout: Seconds an idle pooled connection is kept open
+            rate_limits: Per-provider (max requests, period seconds) overrides
+            session: Existing HTTP session to reuse; it is not closed by close()
+            per_host_concurrency: Per-provider caps on concurrent requests
+            require_keys: Providers that must have a key; raises ValueError if missing
+            compress_threshold: Gzip request bodies larger than this many bytes
+                (off by default, as not every provider accepts compressed bodies)
         """
         self.api_keys = api_keys or {}
+        self._headers: Dict[str, Dict[str, str]] = {
+            provider: _build_headers(provider, key)
+            for provider, key in self.api_keys.items() if key
+        }
+
+        missing = [provider for provider in require_keys or () if provider not in self._headers]
+        if missing:
+            raise ValueError(f"API key not provided for: {', '.join(missing)}")
+        self.pool_per_host = pool_per_host
+        self.compress_threshold = compress_threshold
+        self.keepalive_timeout = keepalive_timeout
+        self._session: Optional[aiohttp.ClientSession] = session
+        self._owns_session = session is None
+
+        # Limits and pauses apply per API key digest, created as each key is first used
+        self.rate_limits = {**PROVIDER_RATE_LIMITS, **(rate_limits or {})}
+        self._limiters: Dict[Tuple[str, Optional[bytes]], Optional[AsyncLimiter]] = {}
+        self._paused_until: Dict[Tuple[str, Optional[bytes]], float] = {}
+
+        self._inflight: Dict[bytes, asyncio.Future] = {}
+
+        self._dispatch = {
+            'openai': self.call_openai,
+            'anthropic': self.call_anthropic,
+            'google': self.call_google,
+            'xai': self.call_xai,
+            'deepseek': self.call_deepseek,
+            'groq': self.call_groq,
+        }
+        self._dispatch_stream = {
+            'openai': self.stream_openai,
+            'anthropic': self.stream_anthropic,
+            'google': self.stream_google,
+        }
+
+        # Semaphores are created lazily so they bind to the running loop
+        self.per_host_concurrency = per_host_concurrency or {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    async def __aenter__(self) -> 'APIClient':
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Get the client's HTTP session, creating it on first use."""
+        if self._session is None or self._session.closed:
+            self._session = create_session(self.pool_per_host, self.keepalive_timeout)
+            self._owns_session = True
+        return self._session
+
+    async def close(self) -> None:
+        """Close the client's HTTP session unless it was passed in."""
+        if self._owns_session and self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def _get_semaphore(self, provider: str) -> asyncio.Semaphore:
+        """Get the semaphore bounding in-flight requests to a provider."""
+        semaphore = self._semaphores.get(provider)
+        if semaphore is None:
+            limit = self.per_host_concurrency.get(provider, DEFAULT_HOST_CONCURRENCY)
+            semaphore = self._semaphores[provider] = asyncio.Semaphore(limit)
+        return semaphore
+
+    def _auth(self, provider: str,
+              api_key: Optional[str]) -> Tuple[Optional[Dict[str, str]], Optional[bytes]]:
+        """
+        Get the request headers and rate limit key for a call.
+
+        Without a per-call key, the client's own prebuilt headers are used.
+        Per-call keys are identified by a digest so the client never holds
+        them after the call; their headers are built per call for the same
+        reason.
+        """
+        if not api_key:
+            return self._headers.get(provider), None
+        key_id = hashlib.blake2b(api_key.encode(), digest_size=16).digest()
+        return _build_headers(provider, api_key), key_id
+
+    def _get_limiter(self, provider: str, key_id: Optional[bytes]) -> Optional[AsyncLimiter]:
+        """Get the rate limiter for a provider and API key digest."""
+        key = (provider, key_id)
+        if key in self._limiters:
+            return self._limiters[key]
+        limit = self.rate_limits.get(provider)
+        limiter = AsyncLimiter(*limit) if limit else None
+        if len(self._limiters) >= KEY_LIMITER_CACHE_SIZE:
+            evicted = next(iter(self._limiters))
+            self._limiters.pop(evicted)
+            self._paused_until.pop(evicted, None)
+        self._limiters[key] = limiter
+        return limiter
+
+    def _update_rate_limit(self, provider: str, key_id: Optional[bytes], headers) -> None:
+        """Pause a provider's requests when its headers report no quota left."""
+        remaining = headers.get('x-ratelimit-remaining-requests')
+        reset = headers.get('x-ratelimit-reset-requests')
+        if remaining != '0' or not reset:
+            return
+        delay = _parse_duration(reset)
+        if delay:
+            loop = asyncio.get_running_loop()
+            self._paused_until[(provider, key_id)] = loop.time() + min(delay, RETRY_MAX_DELAY)
+
+    @asynccontextmanager
+    async def _post(self, provider: str, url: str, timeout: float,
+                    key_id: Optional[bytes] = None,
+                    **kwargs) -> AsyncIterator[aiohttp.ClientResponse]:
+        """
+        POST to a provider, paced by its rate limiter.
+
+        key_id, the digest of a per-call API key, selects the rate limiter,
+        so requests made with different keys don't throttle each other;
+        None means the client's own key.
+
+        At most per_host_concurrency requests per provider are in flight at
+        once; the slot is held until the response (or stream) is finished.
+        Rate-limited (429) and overloaded (503) responses are retried with
+        exponential backoff; the final response is yielded to the caller.
+        """
+        data = kwargs.get('data')
+        if self.compress_threshold is not None and len(data) > self.compress_threshold:
+            kwargs['data'] = gzip.compress(data, compresslevel=GZIP_LEVEL)
+            kwargs['headers'] = {**kwargs.get('headers', {}), 'Content-Encoding': 'gzip'}
+
+        session = await self._get_session()
+        limiter = self._get_limiter(provider, key_id)
+        loop = asyncio.get_running_loop()
+
+        attempt = 0
+        while True:
+            paused_for = self._paused_until.get((provider, key_id), 0) - loop.time()
+            if paused_for > 0:
+                await asyncio.sleep(paused_for)
+            if limiter is not None:
+                await limiter.acquire()
+
+            async with self._get_semaphore(provider), session.post(
+                url,
+                timeout=aiohttp.ClientTimeout(total=timeout),
+                **kwargs
+            ) as response:
+                self._update_rate_limit(provider, key_id, response.headers)
+                if response.status not in RETRY_STATUSES or attempt >= MAX_RETRIES:
+                    yield response
+                    return
+                delay = _retry_delay(response.headers, attempt)
+
+            attempt += 1
+            logger.warning("%s returned %s, retrying in %.1fs", provider, response.status, delay)
+            await asyncio.sleep(delay)
 
     def get_key(self, provider: str) -> Optional[str]:
         """Get API key for a provider."""
         return self.api_keys.get(provider)
 
-    def _is_reasoning_model(self, model: str) -> bool:
-        """Check if model is an OpenAI reasoning model that doesn't support temperature."""
-        reasoning_prefixes = ('o1', 'o3')
-        model_lower = model.lower()
-        return any(model_lower.startswith(prefix) or f'/{prefix}' in model_lower for prefix in reasoning_prefixes)
-
     async def call_openai(self, model: str, messages: List[Dict],
-                          temperature: float = 0.7, max_tokens: int = 4096) -> Dict[str, Any]:
+                          temperature: float = 0.7, max_tokens: int = 4096,
+                          api_key: Optional[str] = None) -> Dict[str, Any]:
         """Call OpenAI API."""
-        api_key = self.get_key('openai')
-        if not api_key:
+        headers, key_id = self._auth('openai', api_key)
+        if headers is None:
             raise ValueError("OpenAI API key not provided")
 
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
-
         data = {
             "model": model,
-            "messages": messages,
             "max_completion_tokens": max_tokens,
         }
 
         # Reasoning models (o1, o3) don't support temperature parameter
-        if not self._is_reasoning_model(model):
+        if not _is_reasoning_model(model):
             data["temperature"] = temperature
 
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers=headers,
-                json=data,
-                timeout=aiohttp.ClientTimeout(total=120)
-            ) as response:
-                result = await response.json()
-
-                if response.status != 200:
-                    error_msg = result.get('error', {}).get('message', str(result))
-                    raise Exception(f"OpenAI API error: {error_msg}")
-
-                return {
-                    "response": result["choices"][0]["message"]["content"],
-                    "input_tokens": result["usage"]["prompt_tokens"],
-                    "output_tokens": result["usage"]["completion_tokens"],
-                    "model": result.get("model", model),
-                }
+        async with self._post(
+            "openai",
+            self.OPENAI_URL,
+            headers=headers,
+            key_id=key_id,
+            data=_json_dumps({**data, "messages": messages}),
+            timeout=120
+        ) as response:
+            result = await response.json(loads=_json_loads)
+
+            if response.status != 200:
+                error_msg = result.get('error', {}).get('message', str(result))
+                raise Exception(f"OpenAI API error: {error_msg}")
+
+            return {
+                "response": result["choices"][0]["message"]["content"],
+                "input_tokens": result["usage"]["prompt_tokens"],
+                "output_tokens": result["usage"]["completion_tokens"],
+                "model": result.get("model", model),
+            }
 
     async def stream_openai(self, model: str, messages: List[Dict],
-                            temperature: float = 0.7, max_tokens: int = 4096) -> AsyncGenerator[str, None]:
+                            temperature: float = 0.7, max_tokens: int = 4096,
+                            api_key: Optional[str] = None) -> AsyncGenerator[str, None]:
         """Stream from OpenAI API."""
-        api_key = self.get_key('openai')
-        if not api_key:
+        headers, key_id = self._auth('openai', api_key)
+        if headers is None:
             raise ValueError("OpenAI API key not provided")
 
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
-
         data = {
             "model": model,
-            "messages": messages,
             "max_completion_tokens": max_tokens,
             "stream": True,
         }
 
         # Reasoning models (o1, o3) don't support temperature parameter
-        if not self._is_reasoning_model(model):
+        if not _is_reasoning_model(model):
             data["temperature"] = temperature
 
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers=headers,
-                json=data,
-                timeout=aiohttp.ClientTimeout(total=300)
-            ) as response:
-                if response.status != 200:
-                    error = await response.json()
-                    raise Exception(f"OpenAI API error: {error}")
-
-                async for line in response.content:
-                    line = line.decode('utf-8').strip()
-                    if line.startswith('data: '):
-                        data_str = line[6:]
-                        if data_str == '[DONE]':
-                            break
-                        try:
-                            import json
-                            chunk = json.loads(data_str)
-                            delta = chunk.get('choices', [{}])[0].get('delta', {})
-                            content = delta.get('content', '')
-                            if content:
-                                yield content
-                        except json.JSONDecodeError:
-                            continue
+        async with self._post(
+            "openai",
+            self.OPENAI_URL,
+            headers=headers,
+            key_id=key_id,
+            data=_json_dumps({**data, "messages": messages}),
+            timeout=300
+        ) as response:
+            if response.status != 200:
+                error = await response.json(loads=_json_loads)
+                raise Exception(f"OpenAI API error: {error}")
+
+            async for data_str in _iter_sse_data(response):
+                if data_str == SSE_DONE:
+                    break
+                try:
+                    chunk = _json_loads(data_str)
+                    delta = chunk.get('choices', [{}])[0].get('delta', {})
+                    content = delta.get('content', '')
+                    if content:
+                        yield content
+                except json.JSONDecodeError:
+                    continue
 
     async def call_anthropic(self, model: str, messages: List[Dict],
-                             temperature: float = 0.7, max_tokens: int = 4096) -> Dict[str, Any]:
+                             temperature: float = 0.7, max_tokens: int = 4096,
+                             api_key: Optional[str] = None) -> Dict[str, Any]:
         """Call Anthropic API."""
-        api_key = self.get_key('anthropic')
-        if not api_key:
+        headers, key_id = self._auth('anthropic', api_key)
+        if headers is None:
             raise ValueError("Anthropic API key not provided")
 
-        headers = {
-            "x-api-key": api_key,
-            "Content-Type": "application/json",
-            "anthropic-version": "2023-06-01"
-        }
-
-        # Extract system message
-        system_content = ""
-        chat_messages = []
-        for msg in messages:
-            if msg["role"] == "system":
-                system_content = msg["content"]
-            else:
-                chat_messages.append(msg)
-
         data = {
             "model": model,
             "max_tokens": max_tokens,
             "temperature": temperature,
-            "messages": chat_messages,
         }
 
-        if system_content:
-            data["system"] = system_content
-
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                "https://api.anthropic.com/v1/messages",
-                headers=headers,
-                json=data,
-                timeout=aiohttp.ClientTimeout(total=120)
-            ) as response:
-                result = await response.json()
-
-                if response.status != 200:
-                    error_msg = result.get('error', {}).get('message', str(result))
-                    raise Exception(f"Anthropic API error: {error_msg}")
-
-                response_text = ""
-                for block in result.get("content", []):
-                    if block["type"] == "text":
-                        response_text += block["text"]
-
-                return {
-                    "response": response_text,
-                    "input_tokens": result["usage"]["input_tokens"],
-                    "output_tokens": result["usage"]["output_tokens"],
-                    "model": result.get("model", model),
-                }
+        async with self._post(
+            "anthropic",
+            self.ANTHROPIC_URL,
+            headers=headers,
+            key_id=key_id,
+            data=_json_dumps({**data, **_anthropic_members(messages)}),
+            timeout=120
+        ) as response:
+            result = await response.json(loads=_json_loads)
+
+            if response.status != 200:
+                error_msg = result.get('error', {}).get('message', str(result))
+                raise Exception(f"Anthropic API error: {error_msg}")
+
+            response_text = ""
+            for block in result.get("content", []):
+                if block["type"] == "text":
+                    response_text += block["text"]
+
+            return {
+                "response": response_text,
+                "input_tokens": result["usage"]["input_tokens"],
+                "output_tokens": result["usage"]["output_tokens"],
+                "model": result.get("model", model),
+            }
 
     async def stream_anthropic(self, model: str, messages: List[Dict],
-                               temperature: float = 0.7, max_tokens: int = 4096) -> AsyncGenerator[str, None]:
+                               temperature: float = 0.7, max_tokens: int = 4096,
+                               api_key: Optional[str] = None) -> AsyncGenerator[str, None]:
         """Stream from Anthropic API."""
-        api_key = self.get_key('anthropic')
-        if not api_key:
+        headers, key_id = self._auth('anthropic', api_key)
+        if headers is None:
             raise ValueError("Anthropic API key not provided")
 
-        headers = {
-            "x-api-key": api_key,
-            "Content-Type": "application/json",
-            "anthropic-version": "2023-06-01"
-        }
-
-        # Extract system message
-        system_content = ""
-        chat_messages = []
-        for msg in messages:
-            if msg["role"] == "system":
-                system_content = msg["content"]
-            else:
-                chat_messages.append(msg)
-
         data = {
             "model": model,
             "max_tokens": max_tokens,
             "temperature": temperature,
-            "messages": chat_messages,
             "stream": True,
         }
 
-        if system_content:
-            data["system"] = system_content
-
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                "https://api.anthropic.com/v1/messages",
-                headers=headers,
-                json=data,
-                timeout=aiohttp.ClientTimeout(total=300)
-            ) as response:
-                if response.status != 200:
-                    error = await response.json()
-                    raise Exception(f"Anthropic API error: {error}")
-
-                async for line in response.content:
-                    line = line.decode('utf-8').strip()
-                    if line.startswith('data: '):
-                        try:
-                            import json
-                            event = json.loads(line[6:])
-                            if event.get('type') == 'content_block_delta':
-                                delta = event.get('delta', {})
-                                if delta.get('type') == 'text_delta':
-                                    yield delta.get('text', '')
-                        except json.JSONDecodeError:
-                            continue
+        async with self._post(
+            "anthropic",
+            self.ANTHROPIC_URL,
+            headers=headers,
+            key_id=key_id,
+            data=_json_dumps({**data, **_anthropic_members(messages)}),
+            timeout=300
+        ) as response:
+            if response.status != 200:
+                error = await response.json(loads=_json_loads)
+                raise Exception(f"Anthropic API error: {error}")
+
+            # Only content_block_delta events carry text; skip the rest unparsed
+            async for data_str in _iter_sse_data(response, event=b'content_block_delta'):
+                try:
+                    delta = _json_loads(data_str).get('delta', {})
+                    if delta.get('type') == 'text_delta':
+                        yield delta.get('text', '')
+                except json.JSONDecodeError:
+                    continue
 
     async def call_google(self, model: str, messages: List[Dict],
-                          temperature: float = 0.7, max_tokens: int = 4096) -> Dict[str, Any]:
+                          temperature: float = 0.7, max_tokens: int = 4096,
+                          api_key: Optional[str] = None) -> Dict[str, Any]:
         """Call Google Gemini API."""
-        api_key = self.get_key('google')
-        if not api_key:
+        headers, key_id = self._auth('google', api_key)
+        if headers is None:
             raise ValueError("Google API key not provided")
 
-        # Convert messages to Google format
-        contents = []
-        system_instruction = ""
-
-        for msg in messages:
-            if msg['role'] == 'system':
-                system_instruction = msg['content']
-            elif msg['role'] == 'user':
-                contents.append({'role': 'user', 'parts': [{'text': msg['content']}]})
-            elif msg['role'] == 'assistant':
-                contents.append({'role': 'model', 'parts': [{'text': msg['content']}]})
-
         payload = {
-            'contents': contents,
             'generationConfig': {
                 'temperature': temperature,
                 'maxOutputTokens': max_tokens
             }
         }
 
-        if system_instruction:
-            payload['systemInstruction'] = {'parts': [{'text': system_instruction}]}
-
-        url = f'https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent?key={api_key}'
-
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                url,
-                json=payload,
-                timeout=aiohttp.ClientTimeout(total=120)
-            ) as response:
-                result = await response.json()
-
-                if response.status != 200:
-                    error_msg = result.get('error', {}).get('message', str(result))
-                    raise Exception(f"Google API error: {error_msg}")
-
-                if 'candidates' not in result or not result['candidates']:
-                    raise Exception("No response from Google API")
-
-                candidate = result['candidates'][0]
-                if 'content' not in candidate or 'parts' not in candidate['content']:
-                    raise Exception("Empty response from Google API")
-
-                response_text = candidate['content']['parts'][0]['text']
-                usage = result.get('usageMetadata', {})
-
-                return {
-                    "response": response_text,
-                    "input_tokens": usage.get('promptTokenCount', 0),
-                    "output_tokens": usage.get('candidatesTokenCount', 0),
-                    "model": model,
-                }
+        url = f'{self.GOOGLE_URL}/{model}:generateContent'
+
+        async with self._post(
+            'google',
+            url,
+            headers=headers,
+            key_id=key_id,
+            data=_json_dumps({**payload, **_google_members(messages)}),
+            timeout=120
+        ) as response:
+            result = await response.json(loads=_json_loads)
+
+            if response.status != 200:
+                error_msg = result.get('error', {}).get('message', str(result))
+                raise Exception(f"Google API error: {error_msg}")
+
+            if 'candidates' not in result or not result['candidates']:
+                raise Exception("No response from Google API")
+
+            candidate = result['candidates'][0]
+            if 'content' not in candidate or 'parts' not in candidate['content']:
+                raise Exception("Empty response from Google API")
+
+            response_text = candidate['content']['parts'][0]['text']
+            usage = result.get('usageMetadata', {})
+
+            return {
+                "response": response_text,
+                "input_tokens": usage.get('promptTokenCount', 0),
+                "output_tokens": usage.get('candidatesTokenCount', 0),
+                "model": model,
+            }
 
     async def stream_google(self, model: str, messages: List[Dict],
-                            temperature: float = 0.7, max_tokens: int = 4096) -> AsyncGenerator[str, None]:
+                            temperature: float = 0.7, max_tokens: int = 4096,
+                            api_key: Optional[str] = None) -> AsyncGenerator[str, None]:
         """Stream from Google Gemini API."""
-        api_key = self.get_key('google')
-        if not api_key:
+        headers, key_id = self._auth('google', api_key)
+        if headers is None:
             raise ValueError("Google API key not provided")
 
-        # Convert messages to Google format
-        contents = []
-        system_instruction = ""
-
-        for msg in messages:
-            if msg['role'] == 'system':
-                system_instruction = msg['content']
-            elif msg['role'] == 'user':
-                contents.append({'role': 'user', 'parts': [{'text': msg['content']}]})
-            elif msg['role'] == 'assistant':
-                contents.append({'role': 'model', 'parts': [{'text': msg['content']}]})
-
         payload = {
-            'contents': contents,
             'generationConfig': {
                 'temperature': temperature,
                 'maxOutputTokens': max_tokens
             }
         }
 
-        if system_instruction:
-            payload['systemInstruction'] = {'parts': [{'text': system_instruction}]}
-
-        url = f'https://generativelanguage.googleapis.com/v1beta/models/{model}:streamGenerateContent?key={api_key}'
-
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                url,
-                json=payload,
-                timeout=aiohttp.ClientTimeout(total=300)
-            ) as response:
-                if response.status != 200:
-                    error = await response.json()
-                    raise Exception(f"Google API error: {error}")
-
-                buffer = ""
-                async for chunk in response.content:
-                    buffer += chunk.decode('utf-8')
-                    # Google streams JSON array chunks
-                    while True:
-                        try:
-                            import json
-                            # Try to parse complete JSON objects
-                            if buffer.strip().startswith('['):
-                                buffer = buffer.strip()[1:]
-                            if buffer.strip().startswith(','):
-                                buffer = buffer.strip()[1:]
-                            if buffer.strip().startswith(']'):
-                                break
-
-                            # Find complete JSON object
-                            depth = 0
-                            end_idx = -1
-                            for i, c in enumerate(buffer):
-                                if c == '{':
-                                    depth += 1
-                                elif c == '}':
-                                    depth -= 1
-                                    if depth == 0:
-                                        end_idx = i + 1
-                                        break
-
-                            if end_idx > 0:
-                                obj_str = buffer[:end_idx]
-                                buffer = buffer[end_idx:]
-                                obj = json.loads(obj_str)
-
-                                candidates = obj.get('candidates', [])
-                                if candidates:
-                                    content = candidates[0].get('content', {})
-                                    parts = content.get('parts', [])
-                                    for part in parts:
-                                        if 'text' in part:
-                                            yield part['text']
-                            else:
-                                break
-                        except json.JSONDecodeError:
-                            break
+        url = f'{self.GOOGLE_URL}/{model}:streamGenerateContent?alt=sse'
+
+        async with self._post(
+            'google',
+            url,
+            headers=headers,
+            key_id=key_id,
+            data=_json_dumps({**payload, **_google_members(messages)}),
+            timeout=300
+        ) as response:
+            if response.status != 200:
+                error = await response.json(loads=_json_loads)
+                raise Exception(f"Google API error: {error}")
+
+            async for data_str in _iter_sse_data(response):
+                try:
+                    obj = _json_loads(data_str)
+                except json.JSONDecodeError:
+                    continue
+
+                candidates = obj.get('candidates', [])
+                if candidates:
+                    content = candidates[0].get('content', {})
+                    parts = content.get('parts', [])
+                    for part in parts:
+                        if 'text' in part:
+                            yield part['text']
 
     async def call_xai(self, model: str, messages: List[Dict],
-                       temperature: float = 0.7, max_tokens: int = 4096) -> Dict[str, Any]:
+                       temperature: float = 0.7, max_tokens: int = 4096,
+                       api_key: Optional[str] = None) -> Dict[str, Any]:
         """Call xAI Grok API."""
-        api_key = self.get_key('xai')
-        if not api_key:
+        headers, key_id = self._auth('xai', api_key)
+        if headers is None:
             raise ValueError("xAI API key not provided")
 
-        headers = {
-            'Authorization': f'Bearer {api_key}',
-            'Content-Type': 'application/json'
-        }
-
         payload = {
             'model': model,
-            'messages': messages,
             'temperature': temperature,
             'max_tokens': max_tokens
         }
 
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                'https://api.x.ai/v1/chat/completions',
-                headers=headers,
-                json=payload,
-                timeout=aiohttp.ClientTimeout(total=120)
-            ) as response:
-                result = await response.json()
-
-                if response.status != 200:
-                    raise Exception(f"xAI API error: {result}")
-
-                return {
-                    "response": result['choices'][0]['message']['content'],
-                    "input_tokens": result['usage']['prompt_tokens'],
-                    "output_tokens": result['usage']['completion_tokens'],
-                    "model": result.get('model', model),
-                }
+        async with self._post(
+            'xai',
+            self.XAI_URL,
+            headers=headers,
+            key_id=key_id,
+            data=_json_dumps({**payload, "messages": messages}),
+            timeout=120
+        ) as response:
+            result = await response.json(loads=_json_loads)
+
+            if response.status != 200:
+                raise Exception(f"xAI API error: {result}")
+
+            return {
+                "response": result['choices'][0]['message']['content'],
+                "input_tokens": result['usage']['prompt_tokens'],
+                "output_tokens": result['usage']['completion_tokens'],
+                "model": result.get('model', model),
+            }
 
     async def call_deepseek(self, model: str, messages: List[Dict],
-                            temperature: float = 0.7, max_tokens: int = 4096) -> Dict[str, Any]:
+                            temperature: float = 0.7, max_tokens: int = 4096,
+                            api_key: Optional[str] = None) -> Dict[str, Any]:
         """Call DeepSeek API."""
-        api_key = self.get_key('deepseek')
-        if not api_key:
+        headers, key_id = self._auth('deepseek', api_key)
+        if headers is None:
             raise ValueError("DeepSeek API key not provided")
 
-        headers = {
-            'Authorization': f'Bearer {api_key}',
-            'Content-Type': 'application/json'
-        }
-
         payload = {
             'model': model,
-            'messages': messages,
             'temperature': temperature,
             'max_tokens': max_tokens
         }
 
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                'https://api.deepseek.com/v1/chat/completions',
-                headers=headers,
-                json=payload,
-                timeout=aiohttp.ClientTimeout(total=120)
-            ) as response:
-                result = await response.json()
-
-                if response.status != 200:
-                    raise Exception(f"DeepSeek API error: {result}")
-
-                return {
-                    "response": result['choices'][0]['message']['content'],
-                    "input_tokens": result['usage']['prompt_tokens'],
-                    "output_tokens": result['usage']['completion_tokens'],
-                    "model": result.get('model', model),
-                }
+        async with self._post(
+            'deepseek',
+            self.DEEPSEEK_URL,
+            headers=headers,
+            key_id=key_id,
+            data=_json_dumps({**payload, "messages": messages}),
+            timeout=120
+        ) as response:
+            result = await response.json(loads=_json_loads)
+
+            if response.status != 200:
+                raise Exception(f"DeepSeek API error: {result}")
+
+            return {
+                "response": result['choices'][0]['message']['content'],
+                "input_tokens": result['usage']['prompt_tokens'],
+                "output_tokens": result['usage']['completion_tokens'],
+                "model": result.get('model', model),
+            }
 
     async def call_groq(self, model: str, messages: List[Dict],
-                        temperature: float = 0.7, max_tokens: int = 4096) -> Dict[str, Any]:
+                        temperature: float = 0.7, max_tokens: int = 4096,
+                        api_key: Optional[str] = None) -> Dict[str, Any]:
         """Call Groq API."""
-        api_key = self.get_key('groq')
-        if not api_key:
+        headers, key_id = self._auth('groq', api_key)
+        if headers is None:
             raise ValueError("Groq API key not provided")
 
-        headers = {
-            'Authorization': f'Bearer {api_key}',
-            'Content-Type': 'application/json'
-        }
-
         payload = {
             'model': model,
-            'messages': messages,
             'temperature': temperature,
             'max_tokens': max_tokens
         }
 
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                'https://api.groq.com/openai/v1/chat/completions',
-                headers=headers,
-                json=payload,
-                timeout=aiohttp.ClientTimeout(total=60)
-            ) as response:
-                result = await response.json()
-
-                if response.status != 200:
-                    if response.status == 429:
-                        raise Exception("Groq rate limit exceeded. Please wait and try again.")
-                    raise Exception(f"Groq API error: {result}")
-
-                return {
-                    "response": result['choices'][0]['message']['content'],
-                    "input_tokens": result['usage']['prompt_tokens'],
-                    "output_tokens": result['usage']['completion_tokens'],
-                    "model": result.get('model', model),
-                }
+        async with self._post(
+            'groq',
+            self.GROQ_URL,
+            headers=headers,
+            key_id=key_id,
+            data=_json_dumps({**payload, "messages": messages}),
+            timeout=60
+        ) as response:
+            result = await response.json(loads=_json_loads)
+
+            if response.status != 200:
+                if response.status == 429:
+                    raise Exception("Groq rate limit exceeded. Please wait and try again.")
+                raise Exception(f"Groq API error: {result}")
+
+            return {
+                "response": result['choices'][0]['message']['content'],
+                "input_tokens": result['usage']['prompt_tokens'],
+                "output_tokens": result['usage']['completion_tokens'],
+                "model": result.get('model', model),
+            }
 
     async def call(self, provider: str, model: str, messages: List[Dict],
-                   temperature: float = 0.7, max_tokens: int = None) -> Dict[str, Any]:
+                   temperature: float = 0.7, max_tokens: int = None,
+                   api_keys: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
         """
         Unified API call method.
 
@@ -516,28 +783,43 @@ class APIClient:
             messages: List of message dicts with 'role' and 'content'
             temperature: Temperature for generation
             max_tokens: Maximum output tokens (uses model default if not specified)
+            api_keys: Keys for this call, used instead of the client's own
 
         Returns:
             Dict with response, input_tokens, output_tokens, cost, model
         """
         if max_tokens is None:
             max_tokens = get_model_max_tokens(provider, model)
-
+        # Empty keys fall back to the client's own, as in __init__
+        api_key = (api_keys or {}).get(provider) or None
+
+        # Identical calls already in flight with the same key share one
+        # provider request
+        key = hashlib.blake2b(
+            _json_dumps([provider, model, messages, temperature, max_tokens, api_key]),
+            digest_size=16
+        ).digest()
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(
+                self._call_provider(provider, model, messages, temperature, max_tokens, api_key)
+            )
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        # Shield so one caller giving up doesn't cancel the others; copy so
+        # callers can't see each other's changes to the result
+        return dict(await asyncio.shield(task))
+
+    async def _call_provider(self, provider: str, model: str, messages: List[Dict],
+                             temperature: float, max_tokens: int,
+                             api_key: Optional[str]) -> Dict[str, Any]:
+        """Call a provider and add the cost to its result."""
         # Route to appropriate provider
-        if provider == 'openai':
-            result = await self.call_openai(model, messages, temperature, max_tokens)
-        elif provider == 'anthropic':
-            result = await self.call_anthropic(model, messages, temperature, max_tokens)
-        elif provider == 'google':
-            result = await self.call_google(model, messages, temperature, max_tokens)
-        elif provider == 'xai':
-            result = await self.call_xai(model, messages, temperature, max_tokens)
-        elif provider == 'deepseek':
-            result = await self.call_deepseek(model, messages, temperature, max_tokens)
-        elif provider == 'groq':
-            result = await self.call_groq(model, messages, temperature, max_tokens)
-        else:
+        call_provider = self._dispatch.get(provider)
+        if call_provider is None:
             raise ValueError(f"Unsupported provider: {provider}")
+        result = await call_provider(model, messages, temperature, max_tokens, api_key)
 
         # Calculate cost
         cost = calculate_cost(provider, model, result['input_tokens'], result['output_tokens'])
@@ -545,8 +827,30 @@ class APIClient:
 
         return result
 
+    async def call_many(self, specs: List[Tuple[str, str, List[Dict]]],
+                        temperature: float = 0.7, max_tokens: int = None,
+                        api_keys: Optional[Dict[str, str]] = None) -> List[Any]:
+        """
+        Call several provider/model pairs concurrently.
+
+        Args:
+            specs: List of (provider, model, messages) tuples
+            temperature: Temperature for generation
+            max_tokens: Maximum output tokens (uses model default if not specified)
+            api_keys: Keys for these calls, used instead of the client's own
+
+        Returns:
+            Result dict for each spec, in order, or the exception it raised
+        """
+        return await asyncio.gather(
+            *(self.call(provider, model, messages, temperature, max_tokens, api_keys)
+              for provider, model, messages in specs),
+            return_exceptions=True
+        )
+
     async def stream(self, provider: str, model: str, messages: List[Dict],
-                     temperature: float = 0.7, max_tokens: int = None) -> AsyncGenerator[str, None]:
+                     temperature: float = 0.7, max_tokens: int = None,
+                     api_keys: Optional[Dict[str, str]] = None) -> AsyncGenerator[str, None]:
         """
         Unified streaming method.
 
@@ -556,6 +860,7 @@ class APIClient:
             messages: List of message dicts
             temperature: Temperature for generation
             max_tokens: Maximum output tokens
+            api_keys: Keys for this call, used instead of the client's own
 
         Yields:
             Text chunks as they arrive
@@ -563,19 +868,160 @@ class APIClient:
         if max_tokens is None:
             max_tokens = get_model_max_tokens(provider, model)
 
-        if provider == 'openai':
-            async for chunk in self.stream_openai(model, messages, temperature, max_tokens):
-                yield chunk
-        elif provider == 'anthropic':
-            async for chunk in self.stream_anthropic(model, messages, temperature, max_tokens):
-                yield chunk
-        elif provider == 'google':
-            async for chunk in self.stream_google(model, messages, temperature, max_tokens):
-                yield chunk
-        else:
+        stream_provider = self._dispatch_stream.get(provider)
+        if stream_provider is None:
             # For providers without streaming, fall back to non-streaming
-            result = await self.call(provider, model, messages, temperature, max_tokens)
+            result = await self.call(provider, model, messages, temperature, max_tokens, api_keys)
             yield result['response']
+            return
+
+        # Empty keys fall back to the client's own, as in __init__
+        api_key = (api_keys or {}).get(provider) or None
+        async for chunk in stream_provider(model, messages, temperature, max_tokens, api_key):
+            yield chunk
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Get the process-wide event loop, starting its thread on first use."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = uvloop.new_event_loop() if uvloop is not None else asyncio.new_event_loop()
+            loop.set_default_executor(ThreadPoolExecutor(
+                max_workers=LOOP_EXECUTOR_WORKERS, thread_name_prefix='api-clients-io'))
+            threading.Thread(target=loop.run_forever, name='api-clients', daemon=True).start()
+            atexit.register(_close_shared_session)
+            _loop = loop
+    return _loop
+
+
+def _close_shared_session() -> None:
+    """Close the shared HTTP session before the interpreter exits."""
+    if _session is not None and not _session.closed:
+        asyncio.run_coroutine_threadsafe(_session.close(), _loop).result(timeout=5)
+
+
+def run_sync(coro: Coroutine[Any, Any, T]) -> T:
+    """Run a coroutine on the shared event loop and wait for its result."""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop()).result()
+
+
+def iter_sync(agen: AsyncIterator[T]) -> Iterator[T]:
+    """
+    Iterate an async generator from synchronous code.
+
+    The generator runs on the shared event loop and hands items over through
+    a queue as they are produced, so each item is yielded as soon as it
+    arrives. Closing the returned iterator cancels the generator.
+    """
+    items: queue.SimpleQueue = queue.SimpleQueue()
+
+    async def pump():
+        try:
+            async for item in agen:
+                items.put((True, item))
+        except Exception as e:
+            items.put((False, e))
+        else:
+            items.put((False, None))
+
+    future = asyncio.run_coroutine_threadsafe(pump(), get_loop())
+    try:
+        while True:
+            ok, item = items.get()
+            if ok:
+                yield item
+            elif item is None:
+                return
+            else:
+                raise item
+    finally:
+        future.cancel()
+
+
+async def coalesce(chunks: AsyncIterator[str], max_size: int,
+                   max_delay: float) -> AsyncGenerator[str, None]:
+    """
+    Merge text chunks that arrive close together.
+
+    The first chunk is passed through immediately. After that, text is
+    buffered until it reaches max_size characters or the oldest buffered
+    chunk has waited max_delay seconds, so batching never holds text back
+    for longer than max_delay.
+    """
+    loop = asyncio.get_running_loop()
+    it = chunks.__aiter__()
+    parts: List[str] = []
+    size = 0
+    deadline = 0.0
+    waiting: Optional[asyncio.Future] = None
+
+    try:
+        chunk = await it.__anext__()
+    except StopAsyncIteration:
+        return
+    yield chunk
+
+    try:
+        while True:
+            if parts:
+                if waiting is None:
+                    waiting = asyncio.ensure_future(it.__anext__())
+                done, _ = await asyncio.wait((waiting,), timeout=deadline - loop.time())
+                if not done:
+                    yield ''.join(parts)
+                    parts.clear()
+                    size = 0
+                    continue
+                next_chunk, waiting = waiting, None
+                try:
+                    chunk = next_chunk.result()
+                except StopAsyncIteration:
+                    break
+                except Exception:
+                    # Send the text already received before the error
+                    yield ''.join(parts)
+                    raise
+            else:
+                try:
+                    chunk = await (waiting if waiting is not None else it.__anext__())
+                except StopAsyncIteration:
+                    break
+                waiting = None
+                deadline = loop.time() + max_delay
+
+            parts.append(chunk)
+            size += len(chunk)
+            if size >= max_size:
+                yield ''.join(parts)
+                parts.clear()
+                size = 0
+
+        if parts:
+            yield ''.join(parts)
+    finally:
+        if waiting is not None:
+            waiting.cancel()
+
+
+async def shared_session() -> aiohttp.ClientSession:
+    """Get the HTTP session shared by all clients on the shared event loop."""
+    global _session
+    if _session is None or _session.closed:
+        _session = create_session()
+    return _session
+
+
+async def shared_client() -> 'APIClient':
+    """
+    Get the client shared by all callers on the shared event loop.
+
+    It holds no keys of its own; pass api_keys to each call instead.
+    """
+    global _client
+    if _client is None:
+        _client = APIClient(session=await shared_session())
+    return _client
 
 
 def call_api(provider: str, model: str, messages: List[Dict],
@@ -593,13 +1039,38 @@ def call_api(provider: str, model: str, messages: List[Dict],
     Returns:
         Dict with response, tokens, cost
     """
-    client = APIClient(api_keys)
-
     async def _call():
+        client = await shared_client()
         return await client.call(
             provider, model, messages,
             temperature=params.get('temperature', 0.7),
-            max_tokens=params.get('max_tokens')
+            max_tokens=params.get('max_tokens'),
+            api_keys=api_keys
+        )
+
+    return run_sync(_call())
+
+
+def call_api_many(specs: List[Tuple[str, str, List[Dict]]],
+                  api_keys: Dict[str, str], **params) -> List[Any]:
+    """
+    Synchronous wrapper for concurrent API calls.
+
+    Args:
+        specs: List of (provider, model, messages) tuples
+        api_keys: Dict mapping provider names to API keys
+        **params: Additional parameters (temperature, max_tokens)
+
+    Returns:
+        Result dict for each spec, in order, or the exception it raised
+    """
+    async def _call():
+        client = await shared_client()
+        return await client.call_many(
+            specs,
+            temperature=params.get('temperature', 0.7),
+            max_tokens=params.get('max_tokens'),
+            api_keys=api_keys
         )
 
-    return asyncio.run(_call())
+    return run_sync(_call())
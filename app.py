@@ -4,17 +4,30 @@ A lightweight, open-source multi-model AI chat interface.
 """
 
 import os
-import json
+import gzip
 import time
-import asyncio
 import logging
-from flask import Flask, request, jsonify, Response, send_from_directory
+from typing import Any, Dict, List, Optional
+
+import msgspec
+import orjson
+from flask import Flask, request, Response, send_from_directory
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 
-from config import MODEL_CONFIGS, get_all_models, calculate_cost
-from api_clients import APIClient
+from config import MODEL_CONFIGS, get_all_models, calculate_cost, model_exists
+from api_clients import coalesce, iter_sync, run_sync, shared_client
+
+# Streamed text is batched into SSE frames of up to this many characters,
+# held back for at most this many seconds
+SSE_FLUSH_SIZE = 2048
+SSE_FLUSH_INTERVAL = 0.02
+
+# SSE frame pieces, kept as bytes so frames go out without re-encoding
+SSE_PREFIX = b'data: '
+SSE_SUFFIX = b'\n\n'
+SSE_DONE_FRAME = b'data: [DONE]\n\n'
 
 # Configure logging
 logging.basicConfig(
@@ -29,14 +42,80 @@ app = Flask(__name__, static_folder='static', static_url_path='')
 # CORS configuration
 CORS(app, origins=['*'], supports_credentials=True)
 
-# Rate limiting (in-memory)
+# Rate limiting (in-memory by default; point at Redis to share across workers)
 limiter = Limiter(
     key_func=get_remote_address,
     app=app,
     default_limits=["200 per hour", "50 per minute"],
-    storage_uri="memory://"
+    strategy="moving-window",
+    storage_uri=os.getenv('RATELIMIT_STORAGE_URI', 'memory://')
 )
 
+def json_response(data) -> Response:
+    """Build a JSON response, encoded with orjson."""
+    return Response(orjson.dumps(data), mimetype='application/json')
+
+
+def estimate_tokens(messages) -> int:
+    """Roughly estimate the tokens in a list of messages (~4 chars per token)."""
+    chars = 0
+    for message in messages:
+        content = message.get('content')
+        if content is not None:
+            chars += len(content)
+    return chars // 4
+
+
+class ChatRequest(msgspec.Struct):
+    """Body of a /api/chat request."""
+    provider: str = ''
+    model: str = ''
+    messages: List[Dict[str, Any]] = []
+    temperature: float = 0.7
+    max_tokens: Optional[int] = None
+    stream: bool = False
+    api_keys: Dict[str, str] = {}
+
+
+async def stream_response(api_keys, provider, model, messages, temperature, max_tokens,
+                          input_tokens, start_time):
+    """Produce the SSE frames for a streamed chat completion."""
+    client = await shared_client()
+    output_chars = 0
+    try:
+        chunks = client.stream(
+            provider, model, messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            api_keys=api_keys
+        )
+        async for chunk in coalesce(chunks, SSE_FLUSH_SIZE, SSE_FLUSH_INTERVAL):
+            output_chars += len(chunk)
+            yield SSE_PREFIX + orjson.dumps({'content': chunk}) + SSE_SUFFIX
+
+        # Send final metadata
+        response_time = time.time() - start_time
+        # Estimate output tokens (rough approximation)
+        output_tokens = output_chars // 4
+        cost = calculate_cost(provider, model, input_tokens, output_tokens)
+
+        metadata = {
+            'type': 'metadata',
+            'provider': provider,
+            'model': model,
+            'input_tokens': input_tokens,
+            'output_tokens': output_tokens,
+            'cost': cost,
+            'response_time': response_time
+        }
+        yield SSE_PREFIX + orjson.dumps(metadata) + SSE_SUFFIX
+        yield SSE_DONE_FRAME
+
+    except Exception as e:
+        logger.error("Streaming error: %s", e)
+        yield SSE_PREFIX + orjson.dumps({'error': str(e)}) + SSE_SUFFIX
+
+
 # Disable caching for development
 @app.after_request
 def add_header(response):
@@ -84,13 +163,24 @@ def serve_manifest():
 # API ENDPOINTS
 # =============================================================================
 
+# The model list never changes at runtime, so encode the response once
+MODELS_JSON = orjson.dumps({
+    'models': get_all_models(),
+    'providers': list(MODEL_CONFIGS.keys())
+})
+MODELS_JSON_GZ = gzip.compress(MODELS_JSON, compresslevel=6)
+
+
 @app.route('/api/models', methods=['GET'])
 def get_models():
     """Return list of available models."""
-    return jsonify({
-        'models': get_all_models(),
-        'providers': list(MODEL_CONFIGS.keys())
-    })
+    if request.accept_encodings['gzip']:
+        response = Response(MODELS_JSON_GZ, mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(MODELS_JSON, mimetype='application/json')
+    response.vary.add('Accept-Encoding')
+    return response
 
 
 @app.route('/api/chat', methods=['POST'])
@@ -115,86 +205,50 @@ def chat():
     """
     try:
         start_time = time.time()
-        data = request.json
-
-        if not data:
-            return jsonify({'error': 'Request body is required'}), 400
-
-        provider = data.get('provider')
-        model = data.get('model')
-        messages = data.get('messages', [])
-        temperature = data.get('temperature', 0.7)
-        max_tokens = data.get('max_tokens')
-        stream = data.get('stream', False)
-        api_keys = data.get('api_keys', {})
-
-        # Validate required fields
+        body = request.get_data(cache=False)
+
+        if not body:
+            return json_response({'error': 'Request body is required'}), 400
+
+        try:
+            req = msgspec.json.decode(body, type=ChatRequest)
+        except msgspec.ValidationError as e:
+            return json_response({'error': f'Invalid request: {e}'}), 400
+        except msgspec.DecodeError:
+            return json_response({'error': 'Request body must be valid JSON'}), 400
+
+        provider = req.provider
+        model = req.model
+        messages = req.messages
+        temperature = req.temperature
+        max_tokens = req.max_tokens
+        stream = req.stream
+        api_keys = req.api_keys
+
+        # Validate required fields; all of this runs before any client is built
         if not provider:
-            return jsonify({'error': 'Provider is required'}), 400
+            return json_response({'error': 'Provider is required'}), 400
         if not model:
-            return jsonify({'error': 'Model is required'}), 400
+            return json_response({'error': 'Model is required'}), 400
         if not messages:
-            return jsonify({'error': 'Messages are required'}), 400
-        if provider not in api_keys:
-            return jsonify({'error': f'API key for {provider} is required'}), 400
-
-        # Create API client
-        client = APIClient(api_keys)
+            return json_response({'error': 'Messages are required'}), 400
+        if not model_exists(provider, model):
+            return json_response({'error': f'Unknown model: {provider}/{model}'}), 400
+        if not api_keys.get(provider):
+            return json_response({'error': f'API key for {provider} is required'}), 400
 
         if stream:
-            # Streaming response
-            def generate():
-                async def stream_response():
-                    full_response = ""
-                    try:
-                        async for chunk in client.stream(
-                            provider, model, messages,
-                            temperature=temperature,
-                            max_tokens=max_tokens
-                        ):
-                            full_response += chunk
-                            yield f"data: {json.dumps({'content': chunk})}\n\n"
-
-                        # Send final metadata
-                        response_time = time.time() - start_time
-                        # Estimate tokens (rough approximation)
-                        input_tokens = sum(len(m.get('content', '')) for m in messages) // 4
-                        output_tokens = len(full_response) // 4
-                        cost = calculate_cost(provider, model, input_tokens, output_tokens)
-
-                        metadata = {
-                            'type': 'metadata',
-                            'provider': provider,
-                            'model': model,
-                            'input_tokens': input_tokens,
-                            'output_tokens': output_tokens,
-                            'cost': cost,
-                            'response_time': response_time
-                        }
-                        yield f"data: {json.dumps(metadata)}\n\n"
-                        yield "data: [DONE]\n\n"
-
-                    except Exception as e:
-                        logger.error(f"Streaming error: {e}")
-                        yield f"data: {json.dumps({'error': str(e)})}\n\n"
-
-                # Run async generator synchronously
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                try:
-                    agen = stream_response()
-                    while True:
-                        try:
-                            chunk = loop.run_until_complete(agen.__anext__())
-                            yield chunk
-                        except StopAsyncIteration:
-                            break
-                finally:
-                    loop.close()
-
+            # Streaming response, produced on the shared event loop. Providers
+            # don't report usage mid-stream, so estimate input tokens up front.
+            frames = stream_response(
+                api_keys, provider, model, messages,
+                temperature, max_tokens,
+                estimate_tokens(messages), start_time
+            )
             return Response(
-                generate(),
+                iter_sync(frames),
                 mimetype='text/event-stream',
+                direct_passthrough=True,
                 headers={
                     'Cache-Control': 'no-cache',
                     'Connection': 'keep-alive',
@@ -203,18 +257,20 @@ def chat():
             )
 
         else:
-            # Non-streaming response
+            # Non-streaming response, on the shared event loop
             async def make_call():
+                client = await shared_client()
                 return await client.call(
                     provider, model, messages,
                     temperature=temperature,
-                    max_tokens=max_tokens
+                    max_tokens=max_tokens,
+                    api_keys=api_keys
                 )
 
-            result = asyncio.run(make_call())
+            result = run_sync(make_call())
             response_time = time.time() - start_time
 
-            return jsonify({
+            return json_response({
                 'response': result['response'],
                 'provider': provider,
                 'model': result.get('model', model),
@@ -225,16 +281,14 @@ def chat():
             })
 
     except Exception as e:
-        logger.error(f"Chat error: {e}")
-        import traceback
-        logger.error(traceback.format_exc())
-        return jsonify({'error': str(e)}), 500
+        logger.exception("Chat error: %s", e)
+        return json_response({'error': str(e)}), 500
 
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint."""
-    return jsonify({
+    return json_response({
         'status': 'healthy',
         'version': '1.0.0'
     })
@@ -247,7 +301,7 @@ def health_check():
 @app.errorhandler(429)
 def ratelimit_handler(e):
     """Handle rate limit exceeded."""
-    return jsonify({
+    return json_response({
         'error': 'Rate limit exceeded. Please slow down.',
         'retry_after': e.description
     }), 429
@@ -256,8 +310,8 @@ def ratelimit_handler(e):
 @app.errorhandler(500)
 def internal_error(e):
     """Handle internal server errors."""
-    logger.error(f"Internal error: {e}")
-    return jsonify({'error': 'Internal server error'}), 500
+    logger.error("Internal error: %s", e)
+    return json_response({'error': 'Internal server error'}), 500
 
 
 # =============================================================================
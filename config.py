@@ -4,7 +4,9 @@ Contains model definitions, pricing, and utility functions.
 """
 
 import os
+from functools import lru_cache
 from pathlib import Path
+from typing import Dict, Tuple
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -318,20 +320,41 @@ MODEL_CONFIGS = {
     },
 }
 
+# Client-side request pacing per provider: (max requests, period in seconds)
+PROVIDER_RATE_LIMITS = {
+    "openai": (500, 60),
+    "anthropic": (50, 60),
+    "google": (60, 60),
+    "xai": (60, 60),
+    "deepseek": (60, 60),
+    "groq": (30, 60),
+}
+
+
+# Per-token (input, output) rates, derived from the per-1K prices above
+_COST_TABLE: Dict[Tuple[str, str], Tuple[float, float]] = {
+    (provider, model): (config['input_cost'] / 1000, config['output_cost'] / 1000)
+    for provider, provider_models in MODEL_CONFIGS.items()
+    for model, config in provider_models.items()
+}
+
 
 def calculate_cost(provider: str, model: str, input_tokens: int, output_tokens: int) -> float:
     """Calculate cost based on token usage."""
-    try:
-        if provider in MODEL_CONFIGS and model in MODEL_CONFIGS[provider]:
-            config = MODEL_CONFIGS[provider][model]
-            input_cost = (input_tokens / 1000) * config['input_cost']
-            output_cost = (output_tokens / 1000) * config['output_cost']
-            return input_cost + output_cost
-        return 0.0
-    except Exception:
+    rates = _COST_TABLE.get((provider, model))
+    if rates is None:
         return 0.0
+    return rates[0] * input_tokens + rates[1] * output_tokens
+
 
+# Bounded, since callers may pass arbitrary names from requests
+@lru_cache(maxsize=256)
+def model_exists(provider: str, model: str) -> bool:
+    """Check whether a provider offers a model."""
+    return model in MODEL_CONFIGS.get(provider, {})
 
+
+@lru_cache(maxsize=256)
 def get_model_max_tokens(provider: str, model: str) -> int:
     """Get the maximum output tokens for a model."""
     try:
@@ -342,8 +365,8 @@ def get_model_max_tokens(provider: str, model: str) -> int:
         return 4096
 
 
-def get_all_models() -> list:
-    """Get a flat list of all available models."""
+def _build_all_models() -> list:
+    """Build a flat list of all available models from MODEL_CONFIGS."""
     models = []
     for provider, provider_models in MODEL_CONFIGS.items():
         for model_name, config in provider_models.items():
@@ -358,3 +381,12 @@ def get_all_models() -> list:
                 'strengths': config.get('strengths', []),
             })
     return models
+
+
+# MODEL_CONFIGS is static, so the flat list is built once
+_ALL_MODELS = _build_all_models()
+
+
+def get_all_models() -> list:
+    """Get a flat list of all available models."""
+    return _ALL_MODELS